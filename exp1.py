@@ -17,12 +17,25 @@ Goal:
 - Verify reachability by ping tests and save all outputs to result1.txt.
 """
 
+import json
+import os
+from shlex import quote
+from subprocess import STDOUT, TimeoutExpired
+
 from mininet.topo import Topo
 from mininet.net import Mininet
 from mininet.node import Node
 from mininet.log import setLogLevel, info
 from mininet.cli import CLI
 
+try:
+    from pyroute2 import NetNS, NetlinkError
+except ImportError:  # optional: fall back to one `ip -batch` per node
+    NetNS = None
+
+# Neighbor states `ip neigh flush` leaves alone by default
+NUD_NOARP, NUD_PERMANENT = 0x40, 0x80
+
 
 class LinuxRouter(Node):
     """A Node with IP forwarding enabled to act as a router."""
@@ -36,6 +49,22 @@ class LinuxRouter(Node):
         super(LinuxRouter, self).terminate()
 
 
+# Fixed MAC per interface. Default interfaces match what autoSetMacs assigns
+# (00:..:0N for the N-th node in sorted order h1, h2, h3, r1, r2); the other
+# router ports continue the sequence. Links are created with these addresses,
+# so configure_arp never has to ask an interface for its MAC.
+MACS = {
+    'h1-eth0': '00:00:00:00:00:01',
+    'h2-eth0': '00:00:00:00:00:02',
+    'h3-eth0': '00:00:00:00:00:03',
+    'r1-eth0': '00:00:00:00:00:04',
+    'r2-eth0': '00:00:00:00:00:05',
+    'r1-eth1': '00:00:00:00:00:06',
+    'r1-eth2': '00:00:00:00:00:07',
+    'r2-eth1': '00:00:00:00:00:08',
+}
+
+
 class NetworkTopo(Topo):
     """Custom topology for Experiment 1 with two routers and three hosts."""
     def build(self, **_opts):
@@ -52,6 +81,8 @@ class NetworkTopo(Topo):
         self.addLink(h1, r1,
                      intfName1='h1-eth0',
                      intfName2='r1-eth0',
+                     addr1=MACS['h1-eth0'],
+                     addr2=MACS['r1-eth0'],
                      params1={'ip': '10.0.0.3/24'},
                      params2={'ip': '10.0.0.1/24'})
 
@@ -59,6 +90,8 @@ class NetworkTopo(Topo):
         self.addLink(r1, r2,
                      intfName1='r1-eth1',
                      intfName2='r2-eth0',
+                     addr1=MACS['r1-eth1'],
+                     addr2=MACS['r2-eth0'],
                      params1={'ip': '10.0.1.1/24'},
                      params2={'ip': '10.0.1.2/24'})
 
@@ -66,6 +99,8 @@ class NetworkTopo(Topo):
         self.addLink(r2, h3,
                      intfName1='r2-eth1',
                      intfName2='h3-eth0',
+                     addr1=MACS['r2-eth1'],
+                     addr2=MACS['h3-eth0'],
                      params1={'ip': '10.0.2.1/24'},
                      params2={'ip': '10.0.2.2/24'})
 
@@ -73,27 +108,130 @@ class NetworkTopo(Topo):
         self.addLink(h2, r1,
                      intfName1='h2-eth0',
                      intfName2='r1-eth2',
+                     addr1=MACS['h2-eth0'],
+                     addr2=MACS['r1-eth2'],
                      params1={'ip': '10.0.3.2/24'},
                      params2={'ip': '10.0.3.4/24'})
 
 
-def tune_router_sysctls(node):
-    """Make the router's ARP/forwarding behavior deterministic for labs."""
+def router_sysctls(intfs):
+    """Return the key=value sysctls that make a router deterministic for labs."""
     # Global
-    node.cmd('sysctl -w net.ipv4.ip_forward=1')
-    node.cmd('sysctl -w net.ipv4.conf.all.rp_filter=0')
-    node.cmd('sysctl -w net.ipv4.conf.default.rp_filter=0')
-    node.cmd('sysctl -w net.ipv4.conf.all.proxy_arp=0')
-    node.cmd('sysctl -w net.ipv4.conf.default.proxy_arp=0')
-    node.cmd('sysctl -w net.ipv4.conf.all.arp_ignore=1')
-    node.cmd('sysctl -w net.ipv4.conf.all.arp_announce=2')
+    settings = [
+        'net.ipv4.ip_forward=1',
+        'net.ipv4.conf.all.rp_filter=0',
+        'net.ipv4.conf.default.rp_filter=0',
+        'net.ipv4.conf.all.proxy_arp=0',
+        'net.ipv4.conf.default.proxy_arp=0',
+        'net.ipv4.conf.all.arp_ignore=1',
+        'net.ipv4.conf.all.arp_announce=2',
+    ]
 
     # Per-interface
-    for intf in node.intfNames():
-        node.cmd(f'sysctl -w net.ipv4.conf.{intf}.rp_filter=0')
-        node.cmd(f'sysctl -w net.ipv4.conf.{intf}.proxy_arp=0')
-        node.cmd(f'sysctl -w net.ipv4.conf.{intf}.arp_ignore=1')
-        node.cmd(f'sysctl -w net.ipv4.conf.{intf}.arp_announce=2')
+    for intf in intfs:
+        settings += [
+            f'net.ipv4.conf.{intf}.rp_filter=0',
+            f'net.ipv4.conf.{intf}.proxy_arp=0',
+            f'net.ipv4.conf.{intf}.arp_ignore=1',
+            f'net.ipv4.conf.{intf}.arp_announce=2',
+        ]
+    return settings
+
+
+def tune_router_sysctls(node):
+    """Make the router's ARP/forwarding behavior deterministic for labs."""
+    # sysctl -w takes any number of key=value pairs: one shell round-trip
+    node.cmd('sysctl -w ' + ' '.join(router_sysctls(node.intfNames())))
+
+
+def ip_batch(node, commands):
+    """Run several iproute2 commands on a node through a single `ip -batch`."""
+    if not commands:
+        return ''
+    script = ' '.join(quote(c) for c in commands)
+    # -force: keep going past a failing line, like separate `ip` calls did
+    return node.cmd(f"printf '%s\\n' {script} | ip -force -batch -")
+
+
+def node_netns(node):
+    """Open a netlink socket inside the node's network namespace."""
+    return NetNS(f'/proc/{node.pid}/ns/net')
+
+
+def set_routes(node, routes):
+    """Install (dst, gateway, dev) routes on a node over a single netlink socket."""
+    if NetNS is None:
+        return ip_batch(node, [f'route replace {dst} via {gw} dev {dev}'
+                               for dst, gw, dev in routes])
+    ns = node_netns(node)
+    try:
+        for dst, gw, dev in routes:
+            # Like `ip -force -batch`: a failing entry doesn't stop the rest
+            try:
+                ns.route('replace', dst=dst, gateway=gw,
+                         oif=ns.link_lookup(ifname=dev)[0])
+            except (NetlinkError, IndexError) as e:
+                info(f'{node.name}: route {dst} via {gw} dev {dev} failed: {e}\n')
+    finally:
+        ns.close()
+
+
+def set_neighbors(node, neighbors, flush=False):
+    """Pin permanent (ip, mac, dev) neighbors on a node, optionally flushing first."""
+    if NetNS is None:
+        commands = [f'neigh flush dev {intf}' for intf in node.intfNames()] if flush else []
+        return ip_batch(node, commands + [
+            f'neigh replace {ip} lladdr {mac} dev {dev} nud permanent'
+            for ip, mac, dev in neighbors])
+    ns = node_netns(node)
+    try:
+        # Like `ip -force -batch`: a failing entry doesn't stop the rest
+        if flush:
+            for msg in ns.get_neighbours():
+                if msg['state'] & (NUD_NOARP | NUD_PERMANENT):
+                    continue
+                try:
+                    ns.neigh('del', family=msg['family'], dst=msg.get_attr('NDA_DST'),
+                             ifindex=msg['ifindex'])
+                except NetlinkError:
+                    pass  # already gone, or not deletable: flush is best-effort
+        for ip, mac, dev in neighbors:
+            try:
+                ns.neigh('replace', dst=ip, lladdr=mac, state=NUD_PERMANENT,
+                         ifindex=ns.link_lookup(ifname=dev)[0])
+            except (NetlinkError, IndexError) as e:
+                info(f'{node.name}: neigh {ip} lladdr {mac} dev {dev} failed: {e}\n')
+    finally:
+        ns.close()
+
+
+# Static routes per router: (destination, next hop, egress interface)
+ROUTES = {
+    # r1: reach 10.0.2.0/24 via r2 over r1-eth1
+    'r1': [('10.0.2.0/24', '10.0.1.2', 'r1-eth1')],
+    # r2: reach 10.0.0.0/24 and 10.0.3.0/24 via r1 over r2-eth0
+    'r2': [('10.0.0.0/24', '10.0.1.1', 'r2-eth0'),
+           ('10.0.3.0/24', '10.0.1.1', 'r2-eth0')],
+}
+
+# Pinned neighbors per node: (IP, interface that owns it, local interface).
+# Hosts pin their default gateway; routers pin ONLY directly-attached hosts
+# and NEXT-HOPS, on the right iface.
+NEIGHBORS = {
+    'h1': [('10.0.0.1', 'r1-eth0', 'h1-eth0')],
+    'h2': [('10.0.3.4', 'r1-eth2', 'h2-eth0')],
+    'h3': [('10.0.2.1', 'r2-eth1', 'h3-eth0')],
+    'r1': [('10.0.0.3', 'h1-eth0', 'r1-eth0'),
+           ('10.0.3.2', 'h2-eth0', 'r1-eth2'),
+           ('10.0.1.2', 'r2-eth0', 'r1-eth1')],
+    'r2': [('10.0.2.2', 'h3-eth0', 'r2-eth1'),
+           ('10.0.1.1', 'r1-eth1', 'r2-eth0')],
+}
+
+
+def pinned_neighbors(name):
+    """Resolve a node's NEIGHBORS entries to (ip, mac, dev) triples."""
+    return [(ip, MACS[owner], dev) for ip, owner, dev in NEIGHBORS[name]]
 
 
 def configure_routes(net):
@@ -101,13 +239,10 @@ def configure_routes(net):
     info('*** Configuring routes\n')
     r1, r2 = net.get('r1'), net.get('r2')
 
-    # r1: reach 10.0.2.0/24 via r2 over r1-eth1
-    r1.cmd('ip route replace 10.0.2.0/24 via 10.0.1.2 dev r1-eth1')
+    set_routes(r1, ROUTES['r1'])
     info('r1: Added route to 10.0.2.0/24 via 10.0.1.2 dev r1-eth1\n')
 
-    # r2: reach 10.0.0.0/24 and 10.0.3.0/24 via r1 over r2-eth0
-    r2.cmd('ip route replace 10.0.0.0/24 via 10.0.1.1 dev r2-eth0')
-    r2.cmd('ip route replace 10.0.3.0/24 via 10.0.1.1 dev r2-eth0')
+    set_routes(r2, ROUTES['r2'])
     info('r2: Added routes to 10.0.0.0/24 and 10.0.3.0/24 via 10.0.1.1 dev r2-eth0\n')
 
     info('*** Routes configured successfully\n')
@@ -120,109 +255,232 @@ def configure_arp(net):
     h1, h2, h3 = net.get('h1', 'h2', 'h3')
     r1, r2 = net.get('r1', 'r2')
 
-    # MACs
-    h1_mac = h1.intf('h1-eth0').MAC()
-    h2_mac = h2.intf('h2-eth0').MAC()
-    h3_mac = h3.intf('h3-eth0').MAC()
-    r1_eth0_mac = r1.intf('r1-eth0').MAC()
-    r1_eth1_mac = r1.intf('r1-eth1').MAC()
-    r1_eth2_mac = r1.intf('r1-eth2').MAC()
-    r2_eth0_mac = r2.intf('r2-eth0').MAC()
-    r2_eth1_mac = r2.intf('r2-eth1').MAC()
-
-    # Clean slate neighbor state
-    for n in (r1, r2):
-        for intf in n.intfNames():
-            n.cmd(f'ip neigh flush dev {intf}')
-
     # Hosts: pin default gateway ARP (bind to their interface)
-    h1.cmd(f'ip neigh replace 10.0.0.1 lladdr {r1_eth0_mac} dev h1-eth0 nud permanent')
+    set_neighbors(h1, pinned_neighbors('h1'))
     info('h1: pinned gateway 10.0.0.1\n')
 
-    h2.cmd(f'ip neigh replace 10.0.3.4 lladdr {r1_eth2_mac} dev h2-eth0 nud permanent')
+    set_neighbors(h2, pinned_neighbors('h2'))
     info('h2: pinned gateway 10.0.3.4\n')
 
-    h3.cmd(f'ip neigh replace 10.0.2.1 lladdr {r2_eth1_mac} dev h3-eth0 nud permanent')
+    set_neighbors(h3, pinned_neighbors('h3'))
     info('h3: pinned gateway 10.0.2.1\n')
 
-    # Routers: pin ONLY directly-attached hosts and NEXT-HOPS, on the right iface
-    # r1 neighbors
-    r1.cmd(f'ip neigh replace 10.0.0.3 lladdr {h1_mac} dev r1-eth0 nud permanent')
-    r1.cmd(f'ip neigh replace 10.0.3.2 lladdr {h2_mac} dev r1-eth2 nud permanent')
-    r1.cmd(f'ip neigh replace 10.0.1.2 lladdr {r2_eth0_mac} dev r1-eth1 nud permanent')
+    # Routers: clean slate neighbor state, then pin
+    set_neighbors(r1, pinned_neighbors('r1'), flush=True)
     info('r1: pinned h1, h2, and next-hop r2 on correct ifaces\n')
 
-    # r2 neighbors
-    r2.cmd(f'ip neigh replace 10.0.2.2 lladdr {h3_mac} dev r2-eth1 nud permanent')
-    r2.cmd(f'ip neigh replace 10.0.1.1 lladdr {r1_eth1_mac} dev r2-eth0 nud permanent')
+    set_neighbors(r2, pinned_neighbors('r2'), flush=True)
     info('r2: pinned h3 and next-hop r1 on correct ifaces\n')
 
     info('*** ARP entries configured successfully\n')
 
 
+def write_setup_script(net, path='setup_exp1.sh'):
+    """Emit a shell script that rebuilds the configured network with `ip -batch`.
+
+    The script recreates every node as a named netns (no Mininet, no Python)
+    with the same links, addresses, MACs, routes, neighbors and sysctls.
+    """
+    lines = ['#!/bin/sh',
+             '# Generated by exp1.py: rebuilds the Experiment 1 network.',
+             '# Tear down with: ' + '; '.join(f'ip netns del {n.name}' for n in net.hosts),
+             'set -e',
+             '',
+             "ip -batch - <<'EOF'"]
+    lines += [f'netns add {node.name}' for node in net.hosts]
+    for link in net.links:
+        i1, i2 = link.intf1, link.intf2
+        lines.append(f'link add {i1.name} address {MACS[i1.name]} netns {i1.node.name} '
+                     f'type veth peer name {i2.name} address {MACS[i2.name]} netns {i2.node.name}')
+    lines.append('EOF')
+
+    for node in net.hosts:
+        commands = ['link set lo up']
+        for intf in node.intfList():
+            if intf.name == 'lo':
+                continue
+            commands += [f'addr add {intf.IP()}/{intf.prefixLen} dev {intf.name}',
+                         f'link set {intf.name} up']
+        default = net.topo.nodeInfo(node.name).get('defaultRoute')
+        if default:
+            commands.append(f'route replace default {default}')
+        commands += [f'route replace {dst} via {gw} dev {dev}'
+                     for dst, gw, dev in ROUTES.get(node.name, [])]
+        commands += [f'neigh replace {ip} lladdr {mac} dev {dev} nud permanent'
+                     for ip, mac, dev in pinned_neighbors(node.name)]
+        lines += ['', f"ip -n {node.name} -batch - <<'EOF'"] + commands + ['EOF']
+        if isinstance(node, LinuxRouter):
+            settings = router_sysctls(node.intfNames())
+            lines.append(f'ip netns exec {node.name} sysctl -qw ' + ' '.join(settings))
+
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.chmod(path, 0o755)
+    info(f'*** Wrote {path}\n')
+
+
+def warm_arp(net):
+    """Exchange one ARP round-trip between each host and its gateway.
+
+    The gateway entries are already pinned `nud permanent`, so this is not
+    needed for address resolution; it touches every host-gateway link once
+    so a dead link is reported before the ping tests rather than during them.
+    """
+    info('*** Probing host gateways with arping\n')
+    gateways = [('h1', 'h1-eth0', '10.0.0.1'),
+                ('h2', 'h2-eth0', '10.0.3.4'),
+                ('h3', 'h3-eth0', '10.0.2.1')]
+
+    # Probe all gateways in parallel, bounded like every other collect()
+    procs = {host: net.get(host).popen(['arping', '-c', '1', '-w', '1', '-I', intf, gw],
+                                       stderr=STDOUT)
+             for host, intf, gw in gateways}
+    for host, out in collect(procs).items():
+        if out is None:
+            info(f'{host}: arping timed out\n')
+        elif procs[host].returncode != 0:
+            info(f'{host}: arping failed (rc={procs[host].returncode}): {out.strip()}\n')
+
+
+ROUTE_COLUMNS = ('dst', 'gateway', 'dev', 'protocol', 'scope')
+NEIGH_COLUMNS = ('dst', 'lladdr', 'dev', 'state')
+
+# Two probes 500 ms apart. In count mode fping's per-probe reply timeout
+# defaults to the period, so each probe waits 500 ms: one lost probe does
+# not fail the test, and a dead path costs ~1 s (2 x 500 ms), not ~10 s.
+# Keep in sync with FPING in exp2.py (the scripts share no module).
+FPING = ['fping', '-c', '2', '-p', '500', '-q']
+
+# Upper bound (seconds) on waiting for any probe or table dump to finish
+COLLECT_TIMEOUT = 3
+
+
+def collect(procs, timeout=COLLECT_TIMEOUT):
+    """Reap popen()ed processes, returning each one's decoded stdout by key.
+
+    A process still running after `timeout` is killed and maps to None.
+    """
+    results = {}
+    for key, p in procs.items():
+        try:
+            out, _ = p.communicate(timeout=timeout)
+        except TimeoutExpired:
+            p.kill()
+            p.communicate()
+            out = None
+        results[key] = out.decode() if out is not None else None
+    return results
+
+
+def ip_json(out, columns):
+    """Render the output of an `ip -json <what> show` dump as aligned text."""
+    if out is None:
+        return '<dump timed out>\n'
+    if not out.strip():
+        # Even an empty table dumps as "[]"; no output at all means failure
+        return '<dump produced no output>\n'
+    try:
+        rows = json.loads(out)
+    except ValueError:
+        return '<dump unparseable>\n' + out.rstrip('\r\n') + '\n'
+    lines = [''.join(f'{col:<20}' for col in columns).rstrip()]
+    for row in rows:
+        cells = [row.get(col, '-') for col in columns]
+        cells = [','.join(c) if isinstance(c, list) else str(c) for c in cells]
+        lines.append(''.join(f'{c:<20}' for c in cells).rstrip())
+    return '\n'.join(lines) + '\n'
+
+
 def run_ping_tests(net, output_file='result1.txt'):
     """Execute ping tests and save results to file."""
     info('*** Running ping tests\n')
 
     h1, h2, h3 = net.get('h1'), net.get('h2'), net.get('h3')
 
-    with open(output_file, 'w') as f:
-        f.write("Experiment 1: IP Routing - Ping Test Results\n")
-        f.write("=" * 60 + "\n\n")
-
-        # Test 1: h1 to h3
-        f.write("Test 1: h1 (10.0.0.3) to h3 (10.0.2.2)\n")
-        f.write("-" * 60 + "\n")
-        f.write(h1.cmd('ping -c 1 10.0.2.2') + "\n")
-
-        # Test 2: h2 to h3
-        f.write("\nTest 2: h2 (10.0.3.2) to h3 (10.0.2.2)\n")
-        f.write("-" * 60 + "\n")
-        f.write(h2.cmd('ping -c 1 10.0.2.2') + "\n")
-
-        # Test 3: h3 to h1
-        f.write("\nTest 3: h3 (10.0.2.2) to h1 (10.0.0.3)\n")
-        f.write("-" * 60 + "\n")
-        f.write(h3.cmd('ping -c 1 10.0.0.3') + "\n")
-
-        # Test 4: h3 to h2
-        f.write("\nTest 4: h3 (10.0.2.2) to h2 (10.0.3.2)\n")
-        f.write("-" * 60 + "\n")
-        f.write(h3.cmd('ping -c 1 10.0.3.2') + "\n")
-
-        # Routing tables
-        f.write("\n" + "=" * 60 + "\n")
-        f.write("Routing Tables\n")
-        f.write("=" * 60 + "\n\n")
-        f.write("Router r1 routing table:\n")
-        f.write("-" * 60 + "\n")
-        f.write(net.get('r1').cmd('route -n') + "\n")
-
-        f.write("\nRouter r2 routing table:\n")
-        f.write("-" * 60 + "\n")
-        f.write(net.get('r2').cmd('route -n') + "\n")
-
-        # ARP tables
-        f.write("\n" + "=" * 60 + "\n")
-        f.write("ARP Tables\n")
-        f.write("=" * 60 + "\n\n")
-        for host in ['h1', 'h2', 'h3', 'r1', 'r2']:
-            f.write(f"{host} ARP table:\n")
-            f.write("-" * 60 + "\n")
-            f.write(net.get(host).cmd('arp -n') + "\n\n")
-
+    tests = [
+        ("Test 1: h1 (10.0.0.3) to h3 (10.0.2.2)", h1, '10.0.2.2'),
+        ("Test 2: h2 (10.0.3.2) to h3 (10.0.2.2)", h2, '10.0.2.2'),
+        ("Test 3: h3 (10.0.2.2) to h1 (10.0.0.3)", h3, '10.0.0.3'),
+        ("Test 4: h3 (10.0.2.2) to h2 (10.0.3.2)", h3, '10.0.3.2'),
+    ]
+
+    # One fping per source host probes all of its destinations at once;
+    # the sources run in parallel and are reaped afterwards
+    targets = {}
+    for _, host, dst in tests:
+        targets.setdefault(host, []).append(dst)
+    procs = {host: host.popen(FPING + dsts, stderr=STDOUT)
+             for host, dsts in targets.items()}
+    results = collect(procs)
+
+    # Table dumps go through popen() too, all nodes in parallel, rather
+    # than one prompt-synchronised cmd() round-trip each
+    dumps = [('r1', 'route'), ('r2', 'route')] + [
+        (name, 'neigh') for name in ('h1', 'h2', 'h3', 'r1', 'r2')]
+    tables = collect({(name, what): net.get(name).popen(['ip', '-json', what, 'show'],
+                                                        stderr=STDOUT)
+                      for name, what in dumps})
+
+    # Accumulate the whole report in memory; write and print it once
+    parts = []
+    W = parts.append
+    W("Experiment 1: IP Routing - Ping Test Results\n")
+    W("=" * 60 + "\n")
+
+    for label, host, dst in tests:
+        W(f"\n{label}\n")
+        W("-" * 60 + "\n")
+        out = results[host]
+        if out is None:
+            W("<fping timed out>\n\n")
+            continue
+        # fping reports one "<target> : xmt/rcv/%loss = ..." line per target;
+        # also keep lines naming it, e.g. "ICMP Host Unreachable ... to <target>"
+        lines = [line for line in out.splitlines() if dst in line.split()]
+        summary = lines if any(line.split(' ', 1)[0] == dst for line in lines) else []
+        if not summary:
+            # No summary (fping missing, exec error, ...): show why
+            summary = [f"no result (rc={procs[host].returncode})"] + out.splitlines()
+        W(''.join(line + "\n" for line in summary) + "\n")
+
+    # Routing tables
+    W("\n" + "=" * 60 + "\n")
+    W("Routing Tables\n")
+    W("=" * 60 + "\n\n")
+    W("Router r1 routing table:\n")
+    W("-" * 60 + "\n")
+    W(ip_json(tables['r1', 'route'], ROUTE_COLUMNS) + "\n")
+
+    W("\nRouter r2 routing table:\n")
+    W("-" * 60 + "\n")
+    W(ip_json(tables['r2', 'route'], ROUTE_COLUMNS) + "\n")
+
+    # ARP tables
+    W("\n" + "=" * 60 + "\n")
+    W("ARP Tables\n")
+    W("=" * 60 + "\n\n")
+    rule = "-" * 60 + "\n"
+    for host in ['h1', 'h2', 'h3', 'r1', 'r2']:
+        parts.extend((f"{host} ARP table:\n", rule,
+                      ip_json(tables[host, 'neigh'], NEIGH_COLUMNS), "\n\n"))
+
+    body = ''.join(parts)
+    # Binary, pre-encoded and big-buffered: one write(), no text layer
+    with open(output_file, 'wb', buffering=1 << 20) as f:
+        f.write(body.encode())
     info(f'*** Ping test results saved to {output_file}\n')
-
-    with open(output_file, 'r') as f:
-        print(f.read())
+    print(body)
 
 
 def run():
     """Create network, configure routes, run tests, and start CLI."""
     setLogLevel('info')
     topo = NetworkTopo()
-    net = Mininet(topo=topo, controller=None, waitConnected=True)
+    # No switches and no controller: nothing to wait for
+    net = Mininet(topo=topo, controller=None, autoSetMacs=True,
+                  waitConnected=False)
 
+    keep_net = False
     try:
         net.start()
         info('*** Network started\n')
@@ -235,22 +493,32 @@ def run():
 
         # === 2) Flush neighbor tables after tuning ===
         for n in (r1, r2):
-            for intf in n.intfNames():
-                n.cmd(f'ip neigh flush dev {intf}')
+            ip_batch(n, [f'neigh flush dev {intf}' for intf in n.intfNames()])
 
         # === 3) Add routes ===
         configure_routes(net)
 
         # === 4) Pin ARP neighbors ===
         configure_arp(net)
+        warm_arp(net)
+
+        # Snapshot the configured network once for Mininet-free rebuilds
+        if not os.path.exists('setup_exp1.sh'):
+            write_setup_script(net)
 
         # === 5) Tests & CLI ===
         run_ping_tests(net)
         info('*** Starting CLI (type "exit" to quit)\n')
         CLI(net)
+        keep_net = bool(os.environ.get('KEEP_NET'))
     finally:
-        net.stop()
-        info('*** Network stopped\n')
+        # Only a clean exit may leave the network up: the node namespaces go
+        # away with their shells, so the kernel reclaims them lazily
+        if keep_net:
+            info('*** KEEP_NET set: skipping net.stop()\n')
+        else:
+            net.stop()
+            info('*** Network stopped\n')
 
 
 if __name__ == '__main__':
@@ -9,17 +9,22 @@ Topology:
 Goal:
 - Start a pure L2 network (OVSKernelSwitch in standalone mode, no controller).
 - Save baseline pings (h1->h3, h2->h3) to result2.txt.
-- From another terminal, add OpenFlow rules on s1:
+- Install OpenFlow rules on s1 programmatically (no manual step):
     * Drop everything that ARRIVES from s1-eth2 (h2 link).
     * Forward everything that ARRIVES from s1-eth1 (h1 link) to s1-eth3 (link to s2).
 - Save s1's flows and post-rule pings to result2.txt.
 """
 
+import io
+import os
+from shlex import quote
+
 from mininet.topo import Topo
 from mininet.net import Mininet
 from mininet.node import OVSKernelSwitch
 from mininet.log import setLogLevel, info
 from mininet.cli import CLI
+from mininet.util import quietRun
 
 
 class L2Topo(Topo):
@@ -41,13 +46,15 @@ class L2Topo(Topo):
         self.addLink(s2, h3)  # becomes s2-eth2 <-> h3-eth0
 
 
-def open_log(filename='result2.txt'):
-    """Open a log file and return a write helper for logging experiment output."""
-    f = open(filename, 'w')
-    def W(s):
-        f.write(s)
-        f.flush()
-    return f, W
+def open_log():
+    """Create an in-memory log buffer and return it with its write helper."""
+    buf = io.StringIO()
+    return buf, buf.write
+
+def save_log(buf, filename='result2.txt'):
+    """Write the buffered experiment output to the log file in one go."""
+    with open(filename, 'wb', buffering=1 << 20) as f:
+        f.write(buf.getvalue().encode())
 
 def write_header(W):
     """Write the experiment header section to the log file."""
@@ -56,17 +63,25 @@ def write_header(W):
 
 def show_ports_and_flows(switch, W, when='BEFORE adding flows'):
     """Record switch port configuration and flow table state using ovs-ofctl."""
+    marker = '--- dump-flows ---'
+    out = switch.cmd(f'ovs-ofctl show {switch.name}; echo {quote(marker)}; '
+                     f'ovs-ofctl dump-flows {switch.name}')
+    ports, _, flows = out.partition(marker)
     W(f'\nSwitch {switch.name} state {when}:\n')
     W('-'*60 + '\n')
-    W('sudo ovs-ofctl show s1\n')
-    W(switch.cmd('ovs-ofctl show s1') + '\n')
-    W('sudo ovs-ofctl dump-flows s1\n')
-    W(switch.cmd('ovs-ofctl dump-flows s1') + '\n')
+    W(f'sudo ovs-ofctl show {switch.name}\n')
+    W(ports + '\n')
+    W(f'sudo ovs-ofctl dump-flows {switch.name}\n')
+    W(flows.lstrip('\r\n') + '\n')
+
+# Same probe flags as FPING in exp1.py; keep the two lists in sync
+FPING = ' '.join(['fping', '-c', '2', '-p', '500', '-q'])
 
 def run_ping_pair(src, dst_ip, label, W):
-    """Run a single ping test from one host to another and log the result."""
-    W(f'{label} (ping -c 1):\n')
-    W(src.cmd(f'ping -c 1 {dst_ip}') + '\n')
+    """Run a single fping test from one host to another and log the result."""
+    W(f'{label} ({FPING}):\n')
+    # fping prints its per-target summary on stderr
+    W(src.cmd(f'{FPING} {dst_ip} 2>&1') + '\n')
 
 def baseline_pings(h1, h2, h3, W):
     """Execute baseline ping tests before installing OpenFlow rules."""
@@ -82,25 +97,53 @@ def post_rule_pings(h1, h2, h3, W):
     run_ping_pair(h1, '10.0.0.3', 'h1 -> h3', W)
     run_ping_pair(h2, '10.0.0.3', 'h2 -> h3', W)
 
-def prompt_to_add_flows():
-    """Pause execution and prompt the user to add OpenFlow rules from another terminal."""
-    info('\n=== ACTION REQUIRED (in another terminal) ===\n')
-    info('1) Inspect port numbers:\n')
-    info('   sudo ovs-ofctl show s1\n\n')
-    info('2) Add flows on s1:\n')
-    info('   sudo ovs-ofctl add-flow s1 "in_port=2,actions=drop"\n')
-    info('   sudo ovs-ofctl add-flow s1 "in_port=1,actions=output:3"\n\n')
-    input('Press ENTER here after you have added the flows on s1...')
-
-def record_commands_section(W):
-    """Log the example ovs-ofctl commands used to configure flow rules on s1."""
+FLOWS = [
+    'in_port=2,actions=drop',
+    'in_port=1,actions=output:3',
+]
+
+def install_flows(switch, W, flows=FLOWS):
+    """Install all OpenFlow rules on the switch with one ovs-ofctl add-flows call.
+
+    The outcome is logged, so a rejected batch cannot pass for installed rules.
+    Returns True if ovs-ofctl succeeded.
+    """
+    info(f'*** Installing {len(flows)} flows on {switch.name}\n')
+    script = ' '.join(quote(flow) for flow in flows)
+    out = switch.cmd(f"printf '%s\\n' {script} | ovs-ofctl add-flows {switch.name} - 2>&1; "
+                     'echo "rc=$?"')
+    out, _, rc = out.strip().rpartition('rc=')
+    out, rc = out.strip(), rc.strip()
+    W(f'\nsudo ovs-ofctl add-flows {switch.name} - ({len(flows)} flows): ')
+    if rc == '0':
+        W('OK\n' + (out + '\n' if out else ''))
+        return True
+    W(f'FAILED (rc={rc})\n{out}\n')
+    info(f'*** add-flows on {switch.name} failed (rc={rc}): {out}\n')
+    return False
+
+def record_commands_section(W, flows=FLOWS):
+    """Log the equivalent ovs-ofctl commands for the flow rules installed on s1."""
     W('Commands used on s1:\n')
-    W('sudo ovs-ofctl add-flow s1 "in_port=2,actions=drop"\n')
-    W('sudo ovs-ofctl add-flow s1 "in_port=1,actions=output:3"\n')
+    for flow in flows:
+        W(f'sudo ovs-ofctl add-flow s1 "{flow}"\n')
+
+def clear_stale_switch_links(topo):
+    """Delete switch-to-switch veths a previous KEEP_NET run left behind.
+
+    Switches are not namespaced, so s1-eth3 <-> s2-eth1 lives in the root
+    namespace and outlives the run; Mininet would then fail to recreate it.
+    Host links vanish with their namespaces and need no cleanup.
+    """
+    for _, _, link in topo.links(withInfo=True):
+        if topo.isSwitch(link['node1']) and topo.isSwitch(link['node2']):
+            # Deleting one end of a veth pair removes both
+            quietRun(f"ip link del {link['node1']}-eth{link['port1']}")
 
 def build_and_start_net():
     """Create and start the Mininet network using the defined L2 topology."""
     topo = L2Topo()
+    clear_stale_switch_links(topo)
     # No controller; OVS standalone does L2 switching
     net = Mininet(topo=topo, controller=None, autoSetMacs=True, cleanup=True)
     net.start()
@@ -114,9 +157,10 @@ def run():
     setLogLevel('info')
     net, (h1, h2, h3, s1, s2) = build_and_start_net()
 
+    keep_net = False
     try:
-        # Prepare log file
-        f, W = open_log('result2.txt')
+        # Prepare log buffer (written to result2.txt at the end)
+        buf, W = open_log()
         write_header(W)
 
         # 1) Baseline tests (no custom flows)
@@ -125,26 +169,33 @@ def run():
         # 2) Show s1 ports & empty flow table
         show_ports_and_flows(s1, W, when='BEFORE adding flows')
 
-        # 3) Pause and let user add flows from another terminal
-        prompt_to_add_flows()
+        # 3) Install the drop/forward flows on s1
+        install_flows(s1, W)
 
-        # 4) Record flow table after user-added rules
+        # 4) Record flow table after the rules are in
         show_ports_and_flows(s1, W, when='AFTER adding flows')
         record_commands_section(W)
 
         # 5) Re-test connectivity after rules
         post_rule_pings(h1, h2, h3, W)
 
-        f.close()
+        save_log(buf, 'result2.txt')
         info('\n*** All results saved to result2.txt\n')
 
-        # CLI
+        # CLI (flows are already installed; kept for manual inspection)
         info('*** Starting CLI (type "exit" to quit)\n')
         CLI(net)
+        keep_net = bool(os.environ.get('KEEP_NET'))
 
     finally:
-        net.stop()
-        info('*** Network stopped\n')
+        # After a failure, always tear down so no stale OVS bridges linger;
+        # after a clean run the next build re-creates s1/s2 (del-br/add-br)
+        # once clear_stale_switch_links() has removed the s1-s2 veth
+        if keep_net:
+            info('*** KEEP_NET set: leaving s1/s2 up\n')
+        else:
+            net.stop()
+            info('*** Network stopped\n')
 
 
 if __name__ == '__main__':